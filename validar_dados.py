@@ -1,10 +1,82 @@
+import numpy as np
 import pandas as pd
 import pandera as pa
 from pandera import Column, DataFrameSchema, Check
 from pathlib import Path
+import argparse
+import importlib.util
 from datetime import datetime
 import re
-from typing import Tuple
+import unicodedata
+from typing import Callable, Optional, Tuple
+
+# O engine 'calamine' do pd.read_excel só existe a partir do pandas 2.2
+_CALAMINE_DISPONIVEL = (
+    importlib.util.find_spec('python_calamine') is not None
+    and tuple(int(parte) for parte in pd.__version__.split('.')[:2]) >= (2, 2)
+)
+
+
+# Padrão de email compilado uma única vez na importação do módulo
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+class _TabelaDigitos(dict):
+    """
+    Tabela de str.translate que converte dígitos decimais Unicode para ASCII
+    e remove qualquer outro caractere, como o \\D do módulo re.
+
+    """
+
+    def __missing__(self, codigo: int) -> Optional[int]:
+        digito = unicodedata.decimal(chr(codigo), None)
+        valor = None if digito is None else ord('0') + digito
+        self[codigo] = valor
+        return valor
+
+
+_DIGITS_TABLE = _TabelaDigitos()
+
+# Linhas convertidas por vez ao gravar o Excel em modo constant_memory
+_TAMANHO_BLOCO_EXCEL = 10_000
+
+# Separadores do relatório de erros
+_SEP_EQ = "=" * 80 + "\n"
+_SEP_DASH = "─" * 80 + "\n"
+
+# Pesos dos dígitos verificadores do CPF. Em int16 a soma cabe com folga
+# (no máximo 9 * 65) e a matriz de dígitos ocupa 1/4 da memória de int64
+_PESOS_DIGITO1 = np.arange(10, 1, -1, dtype=np.int16)
+_PESOS_DIGITO2 = np.arange(11, 1, -1, dtype=np.int16)
+
+
+def _verificar_digitos_numpy(digitos: np.ndarray) -> np.ndarray:
+    """
+    Confere os dois dígitos verificadores de uma matriz (N, 11) de CPFs.
+
+    """
+    digitos16 = digitos[:, :10].astype(np.int16)
+    digito1 = (digitos16[:, :9] @ _PESOS_DIGITO1) % 11
+    digito1 = np.where(digito1 < 2, 0, 11 - digito1)
+    digito2 = (digitos16 @ _PESOS_DIGITO2) % 11
+    digito2 = np.where(digito2 < 2, 0, 11 - digito2)
+    return (digito1 == digitos[:, 9]) & (digito2 == digitos[:, 10])
+
+
+def _validar_distintos(
+    serie: pd.Series, validador: Callable[[pd.Series], pd.Series]
+) -> pd.Series:
+    """
+    Aplica o validador só aos valores distintos da série e replica o resultado
+    nas repetições. Valores nulos são sempre inválidos.
+
+    """
+    codigos, unicos = serie.factorize()
+    resultados = validador(pd.Series(unicos)).to_numpy(dtype=bool)
+    valido = np.zeros(len(serie), dtype=bool)
+    presentes = codigos >= 0
+    valido[presentes] = resultados[codigos[presentes]]
+    return pd.Series(valido, index=serie.index)
 
 
 def _calcular_digito_verificador(cpf_parcial: str) -> int:
@@ -24,13 +96,8 @@ def validar_cpf_individual(cpf: str) -> bool:
     Valida um CPF brasileiro individual.
 
     """
-    # Rejeita valores nulos ou vazios
-    cpf_str = str(cpf).strip()
-    if pd.isna(cpf) or cpf_str == '' or cpf_str == 'nan':
-        return False
-    
-    # Remove caracteres não numéricos
-    cpf_limpo = re.sub(r'\D', '', cpf_str)
+    # Remove caracteres não numéricos; nulos, vazios e 'nan' ficam vazios
+    cpf_limpo = '' if cpf is None else str(cpf).translate(_DIGITS_TABLE)
     
     # CPF deve ter 11 dígitos
     if len(cpf_limpo) != 11:
@@ -40,17 +107,11 @@ def validar_cpf_individual(cpf: str) -> bool:
     if cpf_limpo == cpf_limpo[0] * 11:
         return False
     
-    # Valida primeiro dígito verificador
-    digito1 = _calcular_digito_verificador(cpf_limpo[:9])
-    if digito1 != int(cpf_limpo[9]):
-        return False
-    
-    # Valida segundo dígito verificador
-    digito2 = _calcular_digito_verificador(cpf_limpo[:10])
-    if digito2 != int(cpf_limpo[10]):
-        return False
-    
-    return True
+    # Valida os dígitos verificadores
+    return (
+        _calcular_digito_verificador(cpf_limpo[:9]) == int(cpf_limpo[9])
+        and _calcular_digito_verificador(cpf_limpo[:10]) == int(cpf_limpo[10])
+    )
 
 
 def validar_cpf(serie: pd.Series) -> pd.Series:
@@ -58,7 +119,39 @@ def validar_cpf(serie: pd.Series) -> pd.Series:
     Valida uma série de CPFs.
 
     """
-    return serie.apply(validar_cpf_individual)
+    return _validar_distintos(serie, _validar_cpfs_vetorizado)
+
+
+def _validar_cpfs_vetorizado(serie: pd.Series) -> pd.Series:
+    """
+    Valida uma série de CPFs de uma só vez, sem iterar linha a linha.
+
+    """
+    # Remove caracteres não numéricos, preservando colunas já em StringDtype
+    if not isinstance(serie.dtype, pd.StringDtype):
+        serie = serie.astype('string')
+    cpfs = serie.fillna('').str.translate(_DIGITS_TABLE)
+    valido = np.zeros(len(cpfs), dtype=bool)
+
+    # CPF deve ter 11 dígitos
+    mascara = (cpfs.str.len() == 11).to_numpy(dtype=bool)
+    if not mascara.any():
+        return pd.Series(valido, index=serie.index)
+
+    # Matriz (N, 11) com os dígitos de cada CPF. O to_numpy evita iterar
+    # escalares do PyArrow um a um no join
+    digitos = np.frombuffer(
+        ''.join(cpfs[mascara].to_numpy(dtype=object)).encode('ascii'), dtype=np.uint8
+    ).reshape(-1, 11) - ord('0')
+
+    # Valida os dígitos verificadores
+    verificadores_ok = _verificar_digitos_numpy(digitos)
+
+    # CPFs com todos os dígitos iguais são inválidos
+    repetidos = (digitos == digitos[:, 0:1]).all(axis=1)
+
+    valido[mascara] = verificadores_ok & ~repetidos
+    return pd.Series(valido, index=serie.index)
 
 
 def validar_email_individual(email: str) -> bool:
@@ -66,13 +159,13 @@ def validar_email_individual(email: str) -> bool:
     Valida um endereço de email individual.
 
     """
-    # Rejeita valores nulos ou vazios
-    if pd.isna(email) or str(email).strip() == '' or str(email).strip() == 'nan':
+    # Rejeita valores nulos; vazios e 'nan' já não casam com o padrão
+    if email is None:
         return False
     
-    # Padrão básico de validação de email
-    padrao = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(padrao, str(email)))
+    # Padrão básico de validação de email; fullmatch para que o '$' não
+    # aceite uma quebra de linha final, como no caminho vetorizado
+    return bool(_EMAIL_RE.fullmatch(str(email)))
 
 
 def validar_email(serie: pd.Series) -> pd.Series:
@@ -80,92 +173,247 @@ def validar_email(serie: pd.Series) -> pd.Series:
     Valida uma série de emails.
 
     """
-    return serie.apply(validar_email_individual)
+    return _validar_distintos(serie, _validar_emails_vetorizado)
+
+
+def _validar_emails_vetorizado(serie: pd.Series) -> pd.Series:
+    """
+    Valida uma série de emails de uma só vez, sem iterar linha a linha.
+
+    """
+    emails = serie if isinstance(serie.dtype, pd.StringDtype) else serie.astype('string')
+    # Strings do PyArrow no pandas 2.x só aceitam o padrão como str. O
+    # fullmatch dá o mesmo resultado no re do Python e no RE2 do Arrow
+    return emails.str.fullmatch(_EMAIL_RE.pattern, na=False)
 
 
+# Tipos das colunas, convertidos uma única vez antes da validação.
+# O email usa strings do PyArrow, cujo str.match roda no kernel de regex
+# do Arrow; o CPF fica em strings Python porque str.translate não tem
+# kernel no Arrow e só acrescentaria conversões de ida e volta
+_DTYPES = {
+    "nome": pd.StringDtype(),
+    "cpf": pd.StringDtype("python"),
+    "email": pd.StringDtype("pyarrow"),
+    "valor_contrato": np.dtype("float64"),
+    "idade": pd.Int64Dtype(),
+}
+
 # Definir o schema de validação usando Pandera
 schema = DataFrameSchema(
     {
         "nome": Column(
-            str,
+            _DTYPES["nome"],
             checks=[
                 Check.str_length(min_value=1, max_value=255),
             ],
             nullable=False,
-            coerce=True,
+            coerce=False,
             description="Nome completo do cliente"
         ),
         "cpf": Column(
-            str,
+            _DTYPES["cpf"],
             checks=[
-                Check(validar_cpf, error="CPF inválido")
+                Check(validar_cpf, error="CPF inválido", element_wise=False)
             ],
             nullable=False,  # CPF is required
-            coerce=True,
+            coerce=False,
             description="CPF do cliente (com ou sem formatação)"
         ),
         "email": Column(
-            str,
+            _DTYPES["email"],
             checks=[
-                Check(validar_email, error="Email inválido")
+                Check(validar_email, error="Email inválido", element_wise=False)
             ],
             nullable=False,  # Email is required
-            coerce=True,
+            coerce=False,
             description="Email do cliente"
         ),
         "valor_contrato": Column(
-            float,
+            _DTYPES["valor_contrato"],
             checks=[
                 Check.greater_than_or_equal_to(0, error="Valor do contrato não pode ser negativo")
             ],
             nullable=False,
-            coerce=True,
+            coerce=False,
             description="Valor do contrato em reais"
         ),
         "idade": Column(
-            int,
+            _DTYPES["idade"],
             checks=[
                 Check.greater_than_or_equal_to(1, error="Idade deve ser maior ou igual a 1"),
                 Check.less_than_or_equal_to(150, error="Idade deve ser menor ou igual a 100 anos")
             ],
             nullable=False,
-            coerce=True,
+            coerce=False,
             description="Idade do cliente"
         )
     },
     strict=False,
-    coerce=True
+    coerce=False
 )
 
+# Colunas numéricas, convertidas com pd.to_numeric antes do astype
+_COLUNAS_NUMERICAS = [c for c, tipo in _DTYPES.items() if pd.api.types.is_numeric_dtype(tipo)]
+
+
+def _ler_excel_streaming(arquivo: str) -> pd.DataFrame:
+    """
+    Lê a primeira planilha do arquivo Excel linha a linha, sem criar objetos de célula.
+
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, ())
+        # Ignora linhas totalmente vazias, como o pd.read_excel
+        registros = (linha for linha in linhas if any(v is not None for v in linha))
+        df = pd.DataFrame.from_records(registros, columns=list(cabecalho))
+    finally:
+        wb.close()
+    
+    # Inferência numérica por coluna, como a feita pelo pd.read_excel
+    for coluna in df.columns:
+        if pd.api.types.is_object_dtype(df[coluna]) or pd.api.types.is_string_dtype(df[coluna]):
+            try:
+                df[coluna] = pd.to_numeric(df[coluna])
+            except (TypeError, ValueError):
+                pass
+    return df
+
+
+def _salvar_excel_streaming(df: pd.DataFrame, arquivo: str) -> None:
+    """
+    Grava o DataFrame em Excel linha a linha no modo constant_memory do
+    xlsxwriter, que descarrega cada linha em disco assim que é concluída.
+
+    """
+    import xlsxwriter
+
+    # O modo constant_memory exige escrita em ordem de linha, por isso
+    # as linhas são gravadas diretamente em vez de usar df.to_excel. Datas
+    # usam o mesmo formato padrão do pandas
+    wb = xlsxwriter.Workbook(
+        arquivo,
+        {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'}
+    )
+    try:
+        ws = wb.add_worksheet()
+        ws.write_row(0, 0, list(df.columns))
+        
+        # Converte em blocos para não criar uma cópia object do DataFrame inteiro
+        for inicio in range(0, len(df), _TAMANHO_BLOCO_EXCEL):
+            bloco = df.iloc[inicio:inicio + _TAMANHO_BLOCO_EXCEL]
+            valores = bloco.astype(object).where(bloco.notna(), None)
+            # O xlsxwriter não grava infinitos; usa o mesmo texto do inf_rep do pandas
+            for coluna in bloco.select_dtypes(include='floating').columns:
+                numeros = bloco[coluna].to_numpy(dtype=float, na_value=np.nan)
+                infinitos = np.isinf(numeros)
+                if infinitos.any():
+                    valores[coluna] = valores[coluna].where(
+                        ~infinitos, np.where(numeros > 0, 'inf', '-inf')
+                    )
+            for i, linha in enumerate(valores.itertuples(index=False, name=None), start=inicio + 1):
+                ws.write_row(i, 0, linha)
+    finally:
+        wb.close()
+
 
-def gerar_relatorio_erros(erros: pd.DataFrame, arquivo_saida: str) -> None:
+def gerar_relatorio_erros(
+    erros: pd.DataFrame, arquivo_saida: str, data_hora: Optional[datetime] = None
+) -> None:
     """
     Gera um relatório de erros em formato texto.
 
     """
-    with open(arquivo_saida, 'w', encoding='utf-8') as f:
-        f.write("=" * 80 + "\n")
+    if data_hora is None:
+        data_hora = datetime.now()
+    
+    with open(arquivo_saida, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(_SEP_EQ)
         f.write("RELATÓRIO DE ERROS - VALIDAÇÃO DE DADOS DE CLIENTES\n")
-        f.write("=" * 80 + "\n")
-        f.write(f"Data/Hora: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+        f.write(_SEP_EQ)
+        f.write(f"Data/Hora: {data_hora.strftime('%d/%m/%Y %H:%M:%S')}\n")
         f.write(f"Total de erros: {len(erros)}\n")
-        f.write("=" * 80 + "\n\n")
+        f.write(_SEP_EQ + "\n")
         
-        # Agrupar erros por linha
-        for idx, grupo in erros.groupby('index'):
-            f.write(f"\n{'─' * 80}\n")
-            f.write(f"LINHA {idx + 2}\n")  # +2 porque: +1 para índice começar em 1, +1 para header
-            f.write(f"{'─' * 80}\n")
+        # Agrupar erros por linha: ordena uma vez e detecta a troca de linha
+        erros_ordenados = erros.sort_values('index', kind='stable')
+        campos = erros_ordenados[['index', 'column', 'check', 'failure_case']]
+        partes = []
+        idx_atual = None
+        for idx, coluna, check, valor in campos.itertuples(index=False, name=None):
+            if idx != idx_atual:
+                f.write(''.join(partes))
+                partes = [
+                    "\n",
+                    _SEP_DASH,
+                    f"LINHA {idx + 2}\n",  # +2 porque: +1 para índice começar em 1, +1 para header
+                    _SEP_DASH,
+                ]
+                idx_atual = idx
             
-            for _, erro in grupo.iterrows():
-                f.write(f"\n  Campo: {erro['column']}\n")
-                f.write(f"  Erro: {erro['check']}\n")
-                if pd.notna(erro.get('failure_case')):
-                    f.write(f"  Valor: {erro['failure_case']}\n")
+            partes.append(f"\n  Campo: {coluna}\n")
+            partes.append(f"  Erro: {check}\n")
+            if pd.notna(valor):
+                partes.append(f"  Valor: {valor}\n")
+        f.write(''.join(partes))
         
-        f.write("\n" + "=" * 80 + "\n")
+        f.write("\n" + _SEP_EQ)
         f.write("FIM DO RELATÓRIO\n")
-        f.write("=" * 80 + "\n")
+        f.write(_SEP_EQ)
+
+
+def _converter_tipos(df: pd.DataFrame) -> Tuple[pd.DataFrame, DataFrameSchema]:
+    """
+    Converte as colunas para os tipos de _DTYPES. Colunas numéricas com
+    valores não conversíveis mantêm esses valores originais e ficam com a
+    coerção a cargo do Pandera, que os reporta linha a linha.
+
+    """
+    convertidas = {}
+    colunas_coercao = []
+    for coluna in _COLUNAS_NUMERICAS:
+        if coluna not in df.columns:
+            continue
+        original = df[coluna]
+        numeros = pd.to_numeric(original, errors='coerce')
+        nao_convertidos = numeros.isna()
+        if pd.api.types.is_integer_dtype(_DTYPES[coluna]):
+            # Trunca frações como a coerção para inteiro do Pandera
+            numeros = np.trunc(numeros)
+            nao_convertidos |= ~np.isfinite(numeros)
+        nao_convertidos &= original.notna()
+        if nao_convertidos.any():
+            numeros = numeros.astype(object).where(~nao_convertidos, original)
+            colunas_coercao.append(coluna)
+        convertidas[coluna] = numeros
+    
+    tipos = {
+        coluna: tipo for coluna, tipo in _DTYPES.items()
+        if coluna in df.columns and coluna not in colunas_coercao
+    }
+    df = df.assign(**convertidas).astype(tipos)
+    if not colunas_coercao:
+        return df, schema
+    return df, schema.update_columns({coluna: {"coerce": True} for coluna in colunas_coercao})
+
+
+def _validar_registros(
+    df: pd.DataFrame, esquema: DataFrameSchema = schema
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Valida os registros, retornando os dados validados e os casos de falha.
+
+    """
+    # Uma única passada lazy: sem erros ela custa o mesmo que lazy=False,
+    # e com erros evita repetir as verificações para coletar os casos de falha
+    try:
+        return esquema.validate(df, lazy=True), pd.DataFrame()
+    except pa.errors.SchemaErrors as e:
+        return df, e.failure_cases
 
 
 def validar_dados(arquivo_entrada: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
@@ -179,49 +427,74 @@ def validar_dados(arquivo_entrada: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
     
     # Ler arquivo Excel
     print(f"Lendo arquivo: {arquivo_entrada}")
-    df = pd.read_excel(arquivo_entrada, engine='openpyxl')
+    if _CALAMINE_DISPONIVEL:
+        df = pd.read_excel(arquivo_entrada, engine='calamine')
+    else:
+        df = _ler_excel_streaming(arquivo_entrada)
     print(f"Arquivo lido com sucesso: {len(df)} registros encontrados\n")
     
+    # Converter os tipos uma única vez
+    df, esquema = _converter_tipos(df)
+    
     # Validar usando Pandera
     print("Iniciando validação dos dados...\n")
     
-    try:
-        # Tentar validar todo o DataFrame
-        dados_validados = schema.validate(df, lazy=True)
+    # Tentar validar todo o DataFrame
+    dados_validados, erros_df = _validar_registros(df, esquema)
+    
+    if erros_df.empty:
         print("Todos os dados são válidos!")
         return dados_validados, pd.DataFrame()
-        
-    except pa.errors.SchemaErrors as e:
-        print(f"Foram encontrados erros nos dados\n")
-        
-        # Obter DataFrame com os erros
-        erros_df = e.failure_cases
-        
-        # Filtrar erros que têm índice válido
-        erros_df = erros_df[erros_df['index'].notna()]
-        
-        print(f"Total de erros de validação: {len(erros_df)}\n")
-        
-        # Identificar linhas com erros
-        linhas_com_erro = set(erros_df['index'].unique())
-        print(f"Linhas com erros: {sorted(linhas_com_erro)}\n")
-        
-        # Separar dados válidos dos inválidos
-        dados_validos = df[~df.index.isin(linhas_com_erro)]
-        
-        print(f"Registros válidos: {len(dados_validos)}")
-        print(f"Registros inválidos: {len(linhas_com_erro)}\n")
-        
-        return dados_validos, erros_df
+    
+    print(f"Foram encontrados erros nos dados\n")
+    
+    # Filtrar erros que têm índice válido
+    erros_df = erros_df[erros_df['index'].notna()]
+    
+    print(f"Total de erros de validação: {len(erros_df)}\n")
+    
+    # Identificar linhas com erros
+    linhas_com_erro = np.sort(erros_df['index'].unique().astype(np.int64))
+    print(f"Linhas com erros: {linhas_com_erro.tolist()}\n")
+    
+    # Separar dados válidos dos inválidos (o índice lido do Excel é posicional)
+    com_erro = np.zeros(len(df), dtype=bool)
+    com_erro[linhas_com_erro] = True
+    dados_validos = df.iloc[~com_erro]
+    
+    # Colunas deixadas para a coerção do Pandera só têm, nas linhas válidas,
+    # valores conversíveis
+    tipos = {
+        coluna: _DTYPES[coluna] for coluna in _COLUNAS_NUMERICAS
+        if coluna in dados_validos.columns and dados_validos[coluna].dtype != _DTYPES[coluna]
+    }
+    if tipos:
+        dados_validos = dados_validos.astype(tipos)
+    
+    print(f"Registros válidos: {len(dados_validos)}")
+    print(f"Registros inválidos: {len(linhas_com_erro)}\n")
+    
+    return dados_validos, erros_df
 
 
 def main():
     """Função principal do script."""
+    parser = argparse.ArgumentParser(description="Valida os dados de clientes antes da importação.")
+    parser.add_argument(
+        '--formato', '--format',
+        dest='formato',
+        choices=['parquet', 'xlsx'],
+        default='parquet',
+        help="Formato do arquivo de dados válidos (padrão: parquet)"
+    )
+    args = parser.parse_args()
+    
     # Definir caminhos
     base_path = Path(__file__).parent
     arquivo_entrada = base_path / 'dados_clientes.xlsx'
-    arquivo_relatorio = base_path / f'relatorio_erros_{datetime.now().strftime("%Y%m%d_%H%M%S")}.txt'
-    arquivo_saida_validos = base_path / 'dados_clientes_validos.xlsx'
+    inicio = datetime.now()
+    arquivo_relatorio = base_path / f'relatorio_erros_{inicio.strftime("%Y%m%d_%H%M%S")}.txt'
+    arquivo_saida_validos = base_path / f'dados_clientes_validos.{args.formato}'
     
     # Verificar se arquivo de entrada existe
     if not arquivo_entrada.exists():
@@ -235,7 +508,7 @@ def main():
     # Se houver erros, gerar relatório
     if not erros.empty:
         print(f"\nGerando relatório de erros...")
-        gerar_relatorio_erros(erros, str(arquivo_relatorio))
+        gerar_relatorio_erros(erros, str(arquivo_relatorio), inicio)
         print(f"Relatório salvo em: {arquivo_relatorio}\n")
         
         # Exibir resumo dos erros
@@ -248,7 +521,10 @@ def main():
     
     # Salvar dados válidos
     if not dados_validos.empty:
-        dados_validos.to_excel(arquivo_saida_validos, index=False, engine='openpyxl')
+        if args.formato == 'parquet':
+            dados_validos.to_parquet(arquivo_saida_validos, index=False, compression='zstd')
+        else:
+            _salvar_excel_streaming(dados_validos, str(arquivo_saida_validos))
         print(f"Dados válidos salvos em: {arquivo_saida_validos}")
         print(f"   Total de registros válidos: {len(dados_validos)}\n")
     else: